@@ -1,19 +1,35 @@
-import gzip
+import io
 import multiprocessing
+import queue
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from multiprocessing import Queue
-from typing import Tuple
+from typing import Iterable, Iterator, List, Tuple
 
 import click
 import orjson
 import sys
 from botocore.response import StreamingBody
 from click import BadParameter
+from isal import igzip
 
 import carica_dynamodb_tools.version
 import carica_dynamodb_tools.version
 from carica_dynamodb_tools.session import boto_session
 from carica_dynamodb_tools.utils import remove_protected_attrs
 
+# Number of serialized items a worker collects before writing them to stdout
+OUTPUT_BATCH_ITEMS = 1024
+
+# Size of each read PrefetchReader makes from an S3 response body
+PREFETCH_CHUNK_SIZE = 1024 * 1024
+
+# Number of chunks PrefetchReader may download ahead of its reader
+PREFETCH_CHUNKS = 4
+
+# Start of every line in an export data file, which wraps each item in "Item"
+EXPORT_ITEM_PREFIX = b'{"Item":'
+
 
 def get_export_data_items(
     region: str, export_arn: str
@@ -51,6 +67,215 @@ def get_export_data_items(
     return bucket, item_count, resp['Body']
 
 
+class PrefetchReader(io.RawIOBase):
+    """
+    Read-only file object that downloads an S3 response body in a background
+    thread, so the network transfer overlaps with decompressing and parsing
+    the data already received.
+
+    Closing the reader stops the download thread and closes the body.
+    """
+
+    def __init__(self, body: StreamingBody):
+        self._chunks = queue.Queue(maxsize=PREFETCH_CHUNKS)
+        self._stop = threading.Event()
+        self._buf = memoryview(b'')
+        self._eof = False
+        self._error = None
+        self._thread = threading.Thread(target=self._fetch, args=(body,), daemon=True)
+        self._thread.start()
+
+    def _fetch(self, body: StreamingBody) -> None:
+        try:
+            for chunk in body.iter_chunks(PREFETCH_CHUNK_SIZE):
+                self._chunks.put(chunk)
+                if self._stop.is_set():
+                    return
+            self._chunks.put(b'')
+        except Exception as e:
+            # Hand the error to the reader, which raises it.
+            self._chunks.put(e)
+        finally:
+            body.close()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self._buf:
+            # The download thread has finished after an error or the end of the
+            # body, so don't wait for another chunk.
+            if self._error is not None:
+                raise self._error
+            if self._eof:
+                return 0
+            chunk = self._chunks.get()
+            if isinstance(chunk, Exception):
+                self._error = chunk
+                raise chunk
+            if not chunk:
+                self._eof = True
+                return 0
+            self._buf = memoryview(chunk)
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            # Unblock the download thread if it's waiting for room in the queue.
+            while True:
+                try:
+                    self._chunks.get_nowait()
+                except queue.Empty:
+                    break
+        super().close()
+
+
+def unwrap_export_item(line: bytes, strict: bool) -> bytes:
+    """
+    Get the newline-terminated JSON for the item in one export data file line,
+    without its wrapping "Item" property or any protected attributes.
+
+    Unless ``strict`` is set, a line that looks like ``{"Item":{...}}`` and
+    can't contain protected attributes is copied instead of re-serialized.
+    The copied slice is still parsed, which only succeeds if it is exactly the
+    "Item" object; if it isn't, the line is handled like any other.
+    """
+    if (
+        not strict
+        and line.startswith(EXPORT_ITEM_PREFIX)
+        and line[len(EXPORT_ITEM_PREFIX) : len(EXPORT_ITEM_PREFIX) + 1] == b'{'
+        and line.endswith(b'}}\n')
+        and b'"aws:' not in line
+    ):
+        item_json = line[len(EXPORT_ITEM_PREFIX) : -2]
+        try:
+            orjson.loads(item_json)
+        except orjson.JSONDecodeError:
+            pass
+        else:
+            return item_json + b'\n'
+    item = orjson.loads(line)['Item']
+    item = remove_protected_attrs(item)
+    return orjson.dumps(item) + b'\n'
+
+
+def write_items(
+    items: List[bytes],
+    print_lock: multiprocessing.Lock,
+    item_total: multiprocessing.Value,
+) -> None:
+    """
+    Write serialized, newline-terminated items to stdout and clear ``items``.
+
+    ``items`` is cleared before writing, so if the write fails, a later call
+    can't write the same items again.
+    """
+    if not items:
+        return
+    payload = b''.join(items)
+    count = len(items)
+    items.clear()
+    with print_lock:
+        # Write and flush the whole batch while holding the lock so lines
+        # from different processes can never interleave in the output.
+        sys.stdout.buffer.write(payload)
+        sys.stdout.buffer.flush()
+    with item_total.get_lock():
+        item_total.value += count
+
+
+def get_data_file(s3_client, bucket: str, manifest_item: dict) -> StreamingBody:
+    """
+    Start downloading the JSONL archive in S3 for one data files manifest item.
+
+    :return: the response body to read the archive from
+    """
+    resp = s3_client.get_object(
+        Bucket=bucket,
+        Key=manifest_item['dataFileS3Key'],
+        IfMatch=manifest_item['etag'],
+    )
+    return resp['Body']
+
+
+def read_ahead(
+    executor: Executor, s3_client, bucket: str, manifest_items: Iterable[dict]
+) -> Iterator[Tuple[dict, Future]]:
+    """
+    Yield each manifest item with a future for its data file's response body.
+
+    The download of each data file starts before the previous item is
+    yielded, so the request for the next file overlaps with decoding the
+    current one.
+    """
+    previous = None
+    for manifest_item in manifest_items:
+        body_future = executor.submit(get_data_file, s3_client, bucket, manifest_item)
+        if previous is not None:
+            yield previous
+        previous = (manifest_item, body_future)
+    if previous is not None:
+        yield previous
+
+
+def dump_data_file(
+    bucket: str,
+    manifest_item: dict,
+    body_future: Future,
+    print_lock: multiprocessing.Lock,
+    item_total: multiprocessing.Value,
+    error_total: multiprocessing.Value,
+    strict: bool,
+) -> None:
+    """
+    Dump the items in one JSONL archive in S3 to stdout, reading it from the
+    response body that ``body_future`` (from :func:`read_ahead`) resolves to.
+
+    Errors are reported to stderr and counted in ``error_total``.
+    """
+    # The manifest item is the contents of one manifestFilesS3Key file.  It looks like:
+    # {
+    #   'dataFileS3Key': 'AWSDynamoDB/01680958677849-381aef7c/data/s3rcacg63a6lfieybvp7dw357y.json.gz',
+    #   'etag': 'ba00d841bd1eec340400e8d62c778aa3-1',
+    #   'itemCount': 5344,
+    #   'md5Checksum': 'R66Q93z6mjqdBW/mkgj0/A==',
+    # }
+    key = ''
+    etag = ''
+    items = []
+    try:
+        key = manifest_item['dataFileS3Key']
+        etag = manifest_item['etag']
+        body = body_future.result()
+        # Read lines as bytes; orjson parses UTF-8 bytes directly, so decoding
+        # them to str first would only add work.  ISA-L's inflate is much faster
+        # than zlib's, which matters because decompression is on the hot path.
+        try:
+            with PrefetchReader(body) as reader, igzip.open(
+                reader, 'rb'
+            ) as data_item_lines:
+                for data_item_line in data_item_lines:
+                    items.append(unwrap_export_item(data_item_line, strict))
+                    if len(items) >= OUTPUT_BATCH_ITEMS:
+                        write_items(items, print_lock, item_total)
+        finally:
+            # Write the remaining items, including those read before a read or
+            # parse error.  If a write failed, write_items already cleared them.
+            write_items(items, print_lock, item_total)
+    except Exception as e:
+        with error_total.get_lock():
+            error_total.value += 1
+        with print_lock:
+            print(
+                f'Error getting s3://{bucket}/{key.lstrip("/")} etag={etag}: {e}',
+                file=sys.stderr,
+            )
+
+
 def batch_worker(
     region: str,
     bucket: str,
@@ -58,6 +283,7 @@ def batch_worker(
     print_lock: multiprocessing.Lock,
     item_total: multiprocessing.Value,
     error_total: multiprocessing.Value,
+    strict: bool,
 ) -> None:
     """
     Multiprocessing worker for dumping JSONL archives in S3.
@@ -66,42 +292,20 @@ def batch_worker(
     """
     session = boto_session(region_name=region)
     s3_client = session.client('s3')
-    for manifest_item in iter(item_q.get, None):
-        # The manifest item is the contents of one manifestFilesS3Key file.  It looks like:
-        # {
-        #   'dataFileS3Key': 'AWSDynamoDB/01680958677849-381aef7c/data/s3rcacg63a6lfieybvp7dw357y.json.gz',
-        #   'etag': 'ba00d841bd1eec340400e8d62c778aa3-1',
-        #   'itemCount': 5344,
-        #   'md5Checksum': 'R66Q93z6mjqdBW/mkgj0/A==',
-        # }
-        key = manifest_item['dataFileS3Key']
-        etag = manifest_item['etag']
-        try:
-            resp = s3_client.get_object(Bucket=bucket, Key=key, IfMatch=etag)
-            with gzip.open(resp['Body'], 'rt') as data_item_lines:
-                for data_item_line in data_item_lines:
-                    # Remove the wrapping "Item" property at the top level
-                    item = orjson.loads(data_item_line)['Item']
-                    item = remove_protected_attrs(item)
-                    item_json = orjson.dumps(item)
-                    with print_lock:
-                        # Appending the newline and calling write one time, instead of
-                        # writing the newline with a second call, prevents an apparent
-                        # race where the underlying output doesn't stay consistent when
-                        # multiple threads write to it quickly, even with print_lock.
-                        # The effect of that condition is extra or misplaced newlines
-                        # in the output, which we don't want.
-                        sys.stdout.buffer.write(item_json + b'\n')
-                    with item_total.get_lock():
-                        item_total.value += 1
-        except Exception as e:
-            with error_total.get_lock():
-                error_total.value += 1
-            with print_lock:
-                print(
-                    f'Error getting s3://{bucket}/{key.lstrip("/")} etag={etag}: {e}',
-                    file=sys.stderr,
-                )
+    manifest_items = iter(item_q.get, None)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for manifest_item, body_future in read_ahead(
+            executor, s3_client, bucket, manifest_items
+        ):
+            dump_data_file(
+                bucket,
+                manifest_item,
+                body_future,
+                print_lock,
+                item_total,
+                error_total,
+                strict,
+            )
 
 
 @click.command()
@@ -109,9 +313,15 @@ def batch_worker(
 @click.option(
     '--procs', '-p', help='Number of processes to use', default=4, show_default=True
 )
+@click.option(
+    '--strict',
+    help='Re-serialize every item instead of copying items with no protected '
+    'attributes from the export',
+    is_flag=True,
+)
 @click.argument('export-arn')
 @click.version_option(version=carica_dynamodb_tools.version.__version__)
-def cli(region: str, procs: int, export_arn: str):
+def cli(region: str, procs: int, strict: bool, export_arn: str):
     """
     Dump all items in a JSON-format S3 export of a DynamoDB table to stdout,
     one JSON item per line.
@@ -125,6 +335,10 @@ def cli(region: str, procs: int, export_arn: str):
     the "dump" command.
 
     Protected attributes (those starting with "aws:") are not included in output.
+
+    Items with no protected attributes are copied from the export as-is
+    unless you use the --strict flag, which re-serializes every item.  Both
+    produce equivalent JSON.
     """
     num_procs = int(procs)
     if num_procs < 1:
@@ -147,6 +361,7 @@ def cli(region: str, procs: int, export_arn: str):
         print_lock,
         item_total,
         error_total,
+        strict,
     )
     procs = [
         multiprocessing.Process(target=batch_worker, args=proc_args)
@@ -156,9 +371,11 @@ def cli(region: str, procs: int, export_arn: str):
     for p in procs:
         p.start()
 
-    # Read manifest items, putting one decoded item into the queue at a time.
-    # Put blocks when the queue is full.
-    for line in data_manifest_response.iter_lines():
+    # The manifest only lists the data files, not their items, so it's small
+    # enough to read in one call and split, which is cheaper than iter_lines().
+    # Put one decoded item into the queue at a time.  Put blocks when the queue
+    # is full.
+    for line in data_manifest_response.read().splitlines():
         manifest_item_q.put(orjson.loads(line))
 
     for _ in procs:
@@ -141,26 +141,24 @@ def cli(region: str, procs: str, report: bool, table: str):
         p.start()
 
     # Read items from stdin, batch them up, and send batches to workers.
+    # Lines are read as bytes because orjson parses UTF-8 bytes directly.
     batch = []
-    while True:
-        line = sys.stdin.readline()
-
-        if line:
-            # Strip newlines so we can ignore empty lines
-            stripped_line = line.strip()
-            if stripped_line:
-                batch.append(orjson.loads(stripped_line))
-
-        # Send the batch to the worker when it's full or stdin is closed.
-        # We don't worry about checking for total batch size here (in
-        # serialized JSON bytes) because we assume DynamoDB would not have
-        # supplied records that are too large to load during the dump process.
-        if len(batch) == BATCH_MAX_ITEMS or not line:
+    for line in sys.stdin.buffer:
+        # Skip blank lines; orjson ignores the trailing newline on the rest
+        if not line.isspace():
+            batch.append(orjson.loads(line))
+
+        # Send the batch to the worker when it's full.  We don't worry about
+        # checking for total batch size here (in serialized JSON bytes)
+        # because we assume DynamoDB would not have supplied records that are
+        # too large to load during the dump process.
+        if len(batch) == BATCH_MAX_ITEMS:
             batch_q.put(batch)
             batch = []
 
-        if not line:
-            break
+    # Send the last partial batch when stdin is closed.
+    if batch:
+        batch_q.put(batch)
 
     for _ in procs:
         batch_q.put(None)
@@ -5,7 +5,8 @@ import botocore.session
 
 def boto_session(*args, **kwargs) -> boto3.session.Session:
     """
-    Get a boto3 session configured for more retries.
+    Get a boto3 session configured for more retries, a larger connection pool,
+    and TCP keep-alive so pooled connections stay usable between requests.
     """
     botocore_session = botocore.session.Session()
     botocore_session_config = botocore.config.Config(
@@ -14,6 +15,7 @@ def boto_session(*args, **kwargs) -> boto3.session.Session:
             'max_attempts': 20,
         },
         max_pool_connections=100,
+        tcp_keepalive=True,
     )
     botocore_session.set_default_client_config(botocore_session_config)
     return boto3.session.Session(*args, **kwargs, botocore_session=botocore_session)
@@ -37,13 +37,14 @@ setup(
     keywords='dynamodb backup restore archive dump load',
     packages=find_packages(exclude=['contrib', 'docs', 'tests']),
     install_requires=[
-        'boto3>=1.9.99',
+        'boto3>=1.26.0',
         'click~=8.0',
+        'isal~=1.0',
         'orjson~=3.9.2',
     ],
     extras_require={
         'dev': ['check-manifest'],
-        'test': [],
+        'test': ['pytest'],
     },
     package_data={},
     entry_points={
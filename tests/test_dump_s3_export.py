@@ -0,0 +1,179 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from botocore.response import StreamingBody
+
+from carica_dynamodb_tools import dump_s3_export
+from carica_dynamodb_tools.dump_s3_export import (
+    PrefetchReader,
+    read_ahead,
+    unwrap_export_item,
+)
+
+
+def streaming_body(data: bytes) -> StreamingBody:
+    return StreamingBody(io.BytesIO(data), len(data))
+
+
+class FailingBody:
+    """
+    Response body stand-in that fails after yielding one chunk.
+    """
+
+    def __init__(self):
+        self.closed = False
+
+    def iter_chunks(self, chunk_size):
+        yield b'first'
+        raise IOError('connection reset')
+
+    def close(self):
+        self.closed = True
+
+
+class EndlessBody:
+    """
+    Response body stand-in that never runs out of chunks.
+    """
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def iter_chunks(self, chunk_size):
+        while True:
+            yield b'x' * chunk_size
+
+    def close(self):
+        self.closed.set()
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(dump_s3_export, 'PREFETCH_CHUNK_SIZE', 7)
+
+
+def test_prefetch_reader_reads_whole_body(small_chunks):
+    data = b''.join(b'line %d\n' % i for i in range(1000))
+    with PrefetchReader(streaming_body(data)) as reader:
+        assert reader.read() == data
+        assert reader.read() == b''
+
+
+def test_prefetch_reader_reads_lines_through_buffered_reader(small_chunks):
+    data = b''.join(b'line %d\n' % i for i in range(1000))
+    with PrefetchReader(streaming_body(data)) as reader:
+        assert list(io.BufferedReader(reader, buffer_size=16)) == data.splitlines(
+            keepends=True
+        )
+
+
+def test_prefetch_reader_reraises_download_error_on_every_read():
+    body = FailingBody()
+    with PrefetchReader(body) as reader:
+        assert reader.read(5) == b'first'
+        with pytest.raises(IOError, match='connection reset'):
+            reader.read(5)
+        # A later read must not block waiting for a chunk that never comes.
+        with pytest.raises(IOError, match='connection reset'):
+            reader.read(5)
+    assert body.closed
+
+
+def test_prefetch_reader_close_stops_download():
+    body = EndlessBody()
+    reader = PrefetchReader(body)
+    assert reader.read(3) == b'xxx'
+    reader.close()
+    assert body.closed.wait(timeout=5)
+    assert reader.closed
+
+
+class RecordingS3Client:
+    """
+    S3 client stand-in that records the keys it was asked for.
+    """
+
+    def __init__(self):
+        self.keys = []
+
+    def get_object(self, Bucket, Key, IfMatch):
+        self.keys.append(Key)
+        return {'Body': streaming_body(f'{Bucket}/{Key}@{IfMatch}'.encode())}
+
+
+def test_read_ahead_requests_next_data_file_before_yielding():
+    s3_client = RecordingS3Client()
+    manifest_items = [{'dataFileS3Key': f'k{i}', 'etag': f'e{i}'} for i in range(3)]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pairs = read_ahead(executor, s3_client, 'b', manifest_items)
+
+        manifest_item, body_future = next(pairs)
+        assert manifest_item is manifest_items[0]
+        assert body_future.result().read() == b'b/k0@e0'
+        # The next data file was requested before the first one was handed out.
+        executor.submit(lambda: None).result()
+        assert s3_client.keys == ['k0', 'k1']
+
+        rest = [(item, future.result().read()) for item, future in pairs]
+    assert rest == [
+        (manifest_items[1], b'b/k1@e1'),
+        (manifest_items[2], b'b/k2@e2'),
+    ]
+
+
+def test_read_ahead_delivers_request_errors_through_the_future():
+    s3_client = RecordingS3Client()
+    manifest_items = [{'etag': 'e0'}, {'dataFileS3Key': 'k1', 'etag': 'e1'}]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pairs = list(read_ahead(executor, s3_client, 'b', manifest_items))
+        with pytest.raises(KeyError):
+            pairs[0][1].result()
+        assert pairs[1][1].result().read() == b'b/k1@e1'
+
+
+def test_read_ahead_with_no_items():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert list(read_ahead(executor, RecordingS3Client(), 'b', [])) == []
+
+
+@pytest.mark.parametrize(
+    'line',
+    [
+        b'{"Item":{"a":{"S":"1"}}}\n',
+        b'{"Item":{"a":{"S":"\\u00e9"},"b":{"M":{"c":{"N":"2"}}}}}\n',
+    ],
+)
+def test_unwrap_export_item_copies_export_shaped_line(line):
+    item_json = line[len(b'{"Item":') : -2] + b'\n'
+    assert unwrap_export_item(line, strict=False) == item_json
+
+
+def test_unwrap_export_item_strict_reserializes():
+    line = b'{"Item":{"a":{"S":"\\u00e9"}}}\n'
+    assert unwrap_export_item(line, strict=True) == '{"a":{"S":"é"}}\n'.encode()
+
+
+@pytest.mark.parametrize('strict', [False, True])
+@pytest.mark.parametrize(
+    'line',
+    [
+        # Extra top-level properties
+        b'{"Item":{"a":{"S":"1"}},"X":1}\n',
+        b'{"Item":{"a":{"S":"1"}},"X":{"b":{}}}\n',
+        # Whitespace after the "Item" property name
+        b'{"Item": {"a":{"S":"1"}}}\n',
+        # Protected attributes
+        b'{"Item":{"a":{"S":"1"},"aws:rep:updateregion":{"S":"us-east-1"}}}\n',
+        # No trailing newline on the last line of a file
+        b'{"Item":{"a":{"S":"1"}}}',
+    ],
+)
+def test_unwrap_export_item_parses_other_lines(line, strict):
+    assert unwrap_export_item(line, strict) == b'{"a":{"S":"1"}}\n'
+
+
+def test_unwrap_export_item_rejects_invalid_json():
+    with pytest.raises(ValueError):
+        unwrap_export_item(b'{"Item":{"a":{"S":"1"}}}}\n', strict=False)